@@ -4,29 +4,35 @@ Linux Sandbox API Server
 Implements the sandbox interface for remote desktop testing.
 """
 
+import functools
+import io
 import os
-import subprocess
-import tempfile
+import shutil
+import threading
 import time
 import base64
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+import pybase64
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, Tuple
+import anyio
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from pydantic import BaseModel
-from PIL import Image, ImageGrab
+import mss
 import logging
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
+
+# Selenium is imported on first browser use (see import_selenium) to keep
+# worker startup and idle RSS down; these names are bound at that point.
+webdriver = FirefoxOptions = By = Keys = WebDriverWait = None
+TimeoutException = WebDriverException = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Paladin Linux Sandbox API", version="1.0.0")
+app = FastAPI(title="Paladin Linux Sandbox API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Enable CORS for all origins (adjust in production)
 app.add_middleware(
@@ -131,17 +137,128 @@ class TypeRequest(BaseModel):
     selector: str
     text: str
 
-driver: Optional[webdriver.Firefox] = None
-
-def get_driver() -> webdriver.Firefox:
-    global driver
+# Bound concurrent children so request bursts can't fork-bomb the box or
+# swamp the X server with captures
+_CPUS = os.cpu_count() or 1
+_subprocess_sem = asyncio.Semaphore(max(2, _CPUS * 2))
+# User /command shells get slots of their own: a few long-running ones must
+# not starve /status and the other internal helpers of _subprocess_sem
+_command_sem = asyncio.Semaphore(max(2, _CPUS * 2))
+_capture_sem = asyncio.Semaphore(max(1, _CPUS // 2))
+
+@functools.lru_cache(maxsize=None)
+def resolve_executable(name: str) -> str:
+    """Resolve a command name to its absolute path once per process."""
+    return shutil.which(name) or name
+
+async def run_cmd(
+    argv: list,
+    timeout: Optional[float] = None,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+    sem: asyncio.Semaphore = _subprocess_sem
+) -> Tuple[int, str, str]:
+    """Run argv without blocking the event loop; returns (exit_code, stdout, stderr)."""
+    async with sem:
+        # An absolute executable plus close_fds=False lets CPython spawn via
+        # posix_spawn instead of fork+exec; our own fds are O_CLOEXEC already.
+        proc = await asyncio.create_subprocess_exec(
+            resolve_executable(argv[0]), *argv[1:],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            close_fds=False
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+@app.on_event("startup")
+async def start_selenium_pool():
+    # Firefox/geckodriver is single-threaded, so one worker serializes WebDriver calls
+    app.state.selenium_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="selenium")
+
+@app.on_event("startup")
+async def limit_default_threadpool():
+    # Starlette's 40-thread default is far more than Xvfb + Firefox can service
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.environ.get("FASTAPI_THREADS", "8"))
+
+@app.on_event("shutdown")
+async def stop_selenium_pool():
+    app.state.selenium_pool.shutdown(wait=False)
+
+@app.on_event("startup")
+async def start_screenshot_pool():
+    # Captures and encodes block on the X server and CPU; their own pool keeps
+    # them off the event loop without queueing behind Selenium or Starlette
+    app.state.screenshot_pool = ThreadPoolExecutor(
+        max_workers=max(1, _CPUS // 2), thread_name_prefix="screenshot")
+
+@app.on_event("shutdown")
+async def stop_screenshot_pool():
+    app.state.screenshot_pool.shutdown(wait=False)
+
+async def run_selenium(fn: Callable[[], Any]) -> Any:
+    """Run a blocking Selenium call on the dedicated pool instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.state.selenium_pool, fn)
+
+def import_selenium() -> None:
+    """Bind the Selenium names used by the /browser/* handlers on first use."""
+    global webdriver, FirefoxOptions, By, Keys, WebDriverWait
+    global TimeoutException, WebDriverException, _KEY_MAP
+    if webdriver is not None:
+        return
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    # Map common key names to Selenium key codes
+    _KEY_MAP = {
+        "Enter": Keys.ENTER,
+        "Tab": Keys.TAB,
+        "Escape": Keys.ESCAPE,
+        "Backspace": Keys.BACKSPACE
+    }
+    # Bound last: other threads treat a non-None webdriver as "all names ready"
+    from selenium import webdriver
+
+driver: Optional["webdriver.Firefox"] = None
+# Last time the driver answered a liveness probe (time.monotonic())
+_driver_last_ok: float = 0.0
+DRIVER_PROBE_TTL = 2.0
+# Guards creation of this worker's driver singleton
+_driver_lock = threading.Lock()
+
+def get_driver() -> "webdriver.Firefox":
+    import_selenium()
+    with _driver_lock:
+        return _get_driver_locked()
+
+def _get_driver_locked() -> "webdriver.Firefox":
+    global driver, _driver_last_ok
     if driver is not None:
+        # Skip the geckodriver round-trip if the driver was alive very recently
+        if time.monotonic() - _driver_last_ok < DRIVER_PROBE_TTL:
+            return driver
         try:
             # Check if driver is still alive
             driver.current_url
+            _driver_last_ok = time.monotonic()
             return driver
         except:
-            # Driver is dead, recreate it
+            # Driver is dead, tear it down and recreate it
+            try:
+                driver.quit()
+            except Exception:
+                pass
             driver = None
     
     logger.info("Creating new Firefox driver with display :0")
@@ -168,6 +285,7 @@ def get_driver() -> webdriver.Firefox:
         driver = webdriver.Firefox(options=opts, service=service)
         driver.set_page_load_timeout(30)
         driver.set_window_size(1920, 1080)
+        _driver_last_ok = time.monotonic()
         logger.info("Firefox driver created successfully")
         return driver
     except Exception as e:
@@ -180,6 +298,7 @@ def get_driver() -> webdriver.Firefox:
             basic_opts.add_argument("--height=1080")
             driver = webdriver.Firefox(options=basic_opts)
             driver.set_page_load_timeout(30)
+            _driver_last_ok = time.monotonic()
             logger.info("Firefox driver created with basic config")
             return driver
         except Exception as e2:
@@ -190,6 +309,32 @@ def get_driver() -> webdriver.Firefox:
 async def root():
     return {"message": "Paladin Linux Sandbox API", "status": "running"}
 
+# (checked_at, running) from the last /proc scan
+_x11vnc_cache: Tuple[float, bool] = (0.0, False)
+X11VNC_CHECK_TTL = 1.0
+
+def x11vnc_running() -> bool:
+    """Scan /proc for an x11vnc process without forking pgrep; cached for X11VNC_CHECK_TTL."""
+    global _x11vnc_cache
+    checked_at, running = _x11vnc_cache
+    now = time.monotonic()
+    if now - checked_at < X11VNC_CHECK_TTL:
+        return running
+    running = False
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                if f.read().strip() == "x11vnc":
+                    running = True
+                    break
+        except OSError:
+            # Process exited while scanning
+            continue
+    _x11vnc_cache = (now, running)
+    return running
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check sandbox health and availability."""
@@ -199,12 +344,7 @@ async def health_check():
         desktop_running = display_check
         
         # Check if VNC is accessible by checking process
-        vnc_check = subprocess.run(
-            ["pgrep", "-f", "x11vnc"],
-            capture_output=True,
-            timeout=5
-        )
-        vnc_available = vnc_check.returncode == 0
+        vnc_available = x11vnc_running()
         
         return HealthResponse(
             status="healthy",
@@ -236,13 +376,12 @@ async def execute_command(request: CommandRequest):
         
         if request.background:
             # Run command in background
-            process = subprocess.Popen(
-                request.command,
-                shell=True,
+            process = await asyncio.create_subprocess_exec(
+                "/bin/sh", "-c", request.command,
                 env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+                close_fds=False,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
             )
             
             return CommandResult(
@@ -253,24 +392,22 @@ async def execute_command(request: CommandRequest):
             )
         else:
             # Run command and wait for completion
-            result = subprocess.run(
-                request.command,
-                shell=True,
-                env=env,
-                capture_output=True,
-                text=True,
+            returncode, stdout, stderr = await run_cmd(
+                ["/bin/sh", "-c", request.command],
                 timeout=request.timeout,
-                cwd="/home/sandbox"
+                env=env,
+                cwd="/home/sandbox",
+                sem=_command_sem
             )
             
             return CommandResult(
-                success=result.returncode == 0,
-                stdout=result.stdout,
-                stderr=result.stderr,
-                exit_code=result.returncode
+                success=returncode == 0,
+                stdout=stdout,
+                stderr=stderr,
+                exit_code=returncode
             )
             
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         return CommandResult(
             success=False,
             stdout="",
@@ -288,88 +425,158 @@ async def execute_command(request: CommandRequest):
             error=f"Command execution failed: {e}"
         )
 
-@app.get("/screenshot", response_model=ScreenshotResponse)
-async def take_screenshot():
-    """Take a screenshot of the desktop."""
+# Multiple of 3 so every slice encodes without padding except the last
+B64_CHUNK_SIZE = 48 * 1024
+
+def b64encode_chunked(data: memoryview) -> str:
+    """Base64-encode data slice by slice into a pre-sized buffer to bound peak memory."""
+    out = bytearray((len(data) + 2) // 3 * 4)
+    pos = 0
+    for start in range(0, len(data), B64_CHUNK_SIZE):
+        encoded = pybase64.b64encode(data[start:start + B64_CHUNK_SIZE])
+        out[pos:pos + len(encoded)] = encoded
+        pos += len(encoded)
+    return out.decode("ascii")
+
+# mss holds an X connection that mustn't be shared across the pool's threads
+_grabber = threading.local()
+
+def get_screen_grabber() -> "mss.base.MSSBase":
+    """Return this thread's mss instance so the X connection is reused across captures."""
+    sct = getattr(_grabber, "sct", None)
+    if sct is None:
+        sct = _grabber.sct = mss.mss(display=":0")
+    return sct
+
+def drop_screen_grabber() -> None:
+    """Close this thread's X connection so the next capture reconnects."""
+    sct = getattr(_grabber, "sct", None)
+    _grabber.sct = None
+    if sct is not None:
+        sct.close()
+
+def grab_and_encode(quality: int) -> Tuple[str, str]:
+    """Capture the root window and return (base64 image, format); runs on the screenshot pool."""
+    from PIL import Image
+
     try:
-        # Use xwd to capture the screen
-        with tempfile.NamedTemporaryFile(suffix=".xwd", delete=False) as temp_file:
-            temp_path = temp_file.name
-        
-        # Capture screen using xwd
-        result = subprocess.run([
-            "xwd", "-display", ":0", "-root", "-out", temp_path
-        ], capture_output=True, timeout=10)
-        
-        if result.returncode != 0:
-            return ScreenshotResponse(
-                success=False,
-                timestamp=time.time(),
-                error="Screenshot capture failed"
+        # Grab the root window pixels straight from the X server
+        sct = get_screen_grabber()
+        raw = sct.grab(sct.monitors[0])
+    except Exception:
+        drop_screen_grabber()
+        raise
+    img = Image.frombytes("RGB", raw.size, raw.rgb)
+
+    buf = io.BytesIO()
+    if quality < 100:
+        img = img.resize(
+            (max(1, img.width * quality // 100), max(1, img.height * quality // 100)),
+            Image.BILINEAR
+        )
+        img.save(buf, "JPEG", quality=quality, optimize=False)
+        image_format = "jpeg"
+    else:
+        img.save(buf, "PNG", compress_level=1)
+        image_format = "png"
+    with buf.getbuffer() as encoded:
+        return b64encode_chunked(encoded), image_format
+
+async def capture_png_with_xwd(timeout: float = 10) -> bytes:
+    """Fallback capture: pipe xwd straight into ImageMagick without temp files."""
+    read_fd, write_fd = os.pipe()
+    try:
+        xwd = await asyncio.create_subprocess_exec(
+            resolve_executable("xwd"), "-display", ":0", "-silent", "-root",
+            stdout=write_fd,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            convert = await asyncio.create_subprocess_exec(
+                resolve_executable("convert"), "xwd:-", "png:-",
+                stdin=read_fd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
             )
-        
-        # Convert XWD to PNG using ImageMagick convert
-        png_path = temp_path.replace(".xwd", ".png")
-        convert_result = subprocess.run([
-            "convert", temp_path, png_path
-        ], capture_output=True, timeout=10)
-        
-        if convert_result.returncode != 0:
-            # Fallback: try to read XWD directly (less reliable)
+        except BaseException:
             try:
-                with open(temp_path, "rb") as f:
-                    image_data = base64.b64encode(f.read()).decode()
-                os.unlink(temp_path)
-                return ScreenshotResponse(
-                    success=True,
-                    image_data=image_data,
-                    format="xwd",
-                    timestamp=time.time()
-                )
-            except Exception as e:
-                return ScreenshotResponse(
-                    success=False,
-                    timestamp=time.time(),
-                    error=f"Screenshot conversion failed: {e}"
-                )
-        
-        # Read the PNG file
+                xwd.kill()
+            except ProcessLookupError:
+                pass
+            await xwd.wait()
+            raise
+    finally:
+        # The children hold their own copies of the pipe ends
+        os.close(read_fd)
+        os.close(write_fd)
+    try:
+        png, _ = await asyncio.wait_for(convert.communicate(), timeout=timeout)
+        await asyncio.wait_for(xwd.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        for proc in (xwd, convert):
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        raise
+    if xwd.returncode != 0 or convert.returncode != 0:
+        raise RuntimeError(f"xwd exited {xwd.returncode}, convert exited {convert.returncode}")
+    return png
+
+SCREENSHOT_DEFAULT_QUALITY = 75
+
+def screenshot_json(**fields: Any) -> ORJSONResponse:
+    """Serialize a ScreenshotResponse straight through orjson.
+
+    A response_model would have FastAPI re-validate the model and run
+    jsonable_encoder over the multi-MB base64 string on every capture.
+    """
+    return ORJSONResponse(ScreenshotResponse.model_construct(**fields).model_dump())
+
+@app.get("/screenshot", responses={200: {"model": ScreenshotResponse}})
+async def take_screenshot(quality: int = Query(SCREENSHOT_DEFAULT_QUALITY, ge=1, le=100)):
+    """Take a screenshot of the desktop.
+    
+    quality=100 returns a full-size PNG; lower values scale the image to
+    quality% and return it as a JPEG of that quality.
+    """
+    loop = asyncio.get_running_loop()
+    async with _capture_sem:
         try:
-            with open(png_path, "rb") as f:
-                image_data = base64.b64encode(f.read()).decode()
-            
-            # Cleanup temp files
-            os.unlink(temp_path)
-            os.unlink(png_path)
-            
-            return ScreenshotResponse(
+            image_data, image_format = await loop.run_in_executor(
+                app.state.screenshot_pool, grab_and_encode, quality)
+            return screenshot_json(
+                success=True,
+                image_data=image_data,
+                format=image_format,
+                timestamp=time.time()
+            )
+        except Exception as e:
+            logger.error(f"Screenshot failed: {e}")
+
+        try:
+            png = await capture_png_with_xwd()
+            image_data = await loop.run_in_executor(
+                app.state.screenshot_pool, b64encode_chunked, memoryview(png))
+            return screenshot_json(
                 success=True,
                 image_data=image_data,
                 format="png",
                 timestamp=time.time()
             )
         except Exception as e:
-            return ScreenshotResponse(
+            logger.error(f"Screenshot fallback failed: {e}")
+            return screenshot_json(
                 success=False,
                 timestamp=time.time(),
-                error=f"Failed to read screenshot: {e}"
+                error=f"Screenshot failed: {e}"
             )
-            
-    except Exception as e:
-        logger.error(f"Screenshot failed: {e}")
-        return ScreenshotResponse(
-            success=False,
-            timestamp=time.time(),
-            error=f"Screenshot failed: {e}"
-        )
 
 @app.post("/browser/navigate")
 async def browser_navigate(req: NavigateRequest):
     try:
         logger.info(f"Browser navigate requested to: {req.url}")
         
-        # Try to get driver, but handle failures gracefully
-        try:
+        def _navigate():
             d = get_driver()
             
             # Log current state
@@ -382,8 +589,13 @@ async def browser_navigate(req: NavigateRequest):
             
             # Wait for page to load
             wait_time = (req.wait_ms or 2000) / 1000
-            logger.info(f"Waiting {wait_time} seconds for page to load")
-            time.sleep(wait_time)
+            logger.info(f"Waiting up to {wait_time} seconds for page to load")
+            try:
+                WebDriverWait(d, wait_time).until(
+                    lambda drv: drv.execute_script("return document.readyState") == "complete"
+                )
+            except TimeoutException:
+                logger.info("Page still loading after wait; continuing")
             
             # Verify navigation
             new_url = d.current_url
@@ -397,6 +609,11 @@ async def browser_navigate(req: NavigateRequest):
             except Exception as ss_error:
                 logger.warning(f"Failed to save debug screenshot: {ss_error}")
             
+            return new_url
+        
+        # Try to drive the browser, but handle failures gracefully
+        try:
+            new_url = await run_selenium(_navigate)
             return {"success": True, "url": new_url}
             
         except Exception as browser_error:
@@ -409,12 +626,40 @@ async def browser_navigate(req: NavigateRequest):
         logger.error(f"Browser navigation failed completely: {e}")
         return {"success": False, "error": str(e)}
 
+# Single-round-trip element actions; they throw so callers fall back to find_element
+_CLICK_JS = """
+const el = document.querySelector(arguments[0]);
+if (!el) throw new Error('no element matches ' + arguments[0]);
+el.click();
+"""
+
+_TYPE_JS = """
+const el = document.querySelector(arguments[0]);
+if (!el || !('value' in el)) throw new Error('no input matches ' + arguments[0]);
+el.focus();
+// the prototype's setter, not el.value: React/Vue shadow the instance property
+// and would otherwise drop the change on their next render
+let proto = Object.getPrototypeOf(el), desc;
+while (proto && !(desc = Object.getOwnPropertyDescriptor(proto, 'value'))) proto = Object.getPrototypeOf(proto);
+if (desc && desc.set) desc.set.call(el, arguments[1]); else el.value = arguments[1];
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value === arguments[1];
+"""
+
 @app.post("/browser/click")
 async def browser_click(req: ClickRequest):
-    try:
+    def _click():
         d = get_driver()
-        el = d.find_element(By.CSS_SELECTOR, req.selector)
-        el.click()
+        try:
+            # Lookup + click in one WebDriver round-trip
+            d.execute_script(_CLICK_JS, req.selector)
+        except WebDriverException:
+            el = d.find_element(By.CSS_SELECTOR, req.selector)
+            el.click()
+    
+    try:
+        await run_selenium(_click)
         return {"success": True}
     except Exception as e:
         logger.error(f"Browser click failed: {e}")
@@ -423,11 +668,21 @@ async def browser_click(req: ClickRequest):
 
 @app.post("/browser/type")
 async def browser_type(req: TypeRequest):
-    try:
+    def _type():
         d = get_driver()
+        try:
+            # Lookup + set value in one WebDriver round-trip
+            if d.execute_script(_TYPE_JS, req.selector, req.text):
+                return
+        except WebDriverException:
+            pass
+        # the page ignored or rewrote the value (e.g. a masked input): type it for real
         el = d.find_element(By.CSS_SELECTOR, req.selector)
         el.clear()
         el.send_keys(req.text)
+    
+    try:
+        await run_selenium(_type)
         return {"success": True}
     except Exception as e:
         logger.error(f"Browser type failed: {e}")
@@ -437,8 +692,8 @@ async def browser_type(req: TypeRequest):
 @app.get("/browser/page_content")
 async def browser_page_content():
     try:
-        d = get_driver()
-        return {"success": True, "content": d.page_source[:200000]}
+        content = await run_selenium(lambda: get_driver().page_source[:200000])
+        return ORJSONResponse({"success": True, "content": content})
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -448,47 +703,51 @@ class FindRequest(BaseModel):
 @app.post("/browser/find")
 async def browser_find(req: FindRequest):
     try:
-        d = get_driver()
-        elements = d.find_elements(By.CSS_SELECTOR, req.selector)
+        # Count matches in the page with one round-trip instead of materializing WebElements
+        count = await run_selenium(
+            lambda: get_driver().execute_script(
+                "return document.querySelectorAll(arguments[0]).length;", req.selector
+            )
+        )
         # Return simple index-based selectors for reuse
-        selectors = []
-        for idx, _ in enumerate(elements):
-            selectors.append(f"{req.selector}:nth-of-type({idx+1})")
-        return {"success": True, "selectors": selectors, "count": len(elements)}
+        selectors = [f"{req.selector}:nth-of-type({idx+1})" for idx in range(count)]
+        return {"success": True, "selectors": selectors, "count": count}
     except Exception as e:
         return {"success": False, "error": str(e), "selectors": [], "count": 0}
 
 class KeyRequest(BaseModel):
     key: str
 
+# Populated by import_selenium()
+_KEY_MAP: Dict[str, str] = {}
+
 @app.post("/browser/press_key")
 async def browser_press_key(req: KeyRequest):
-    try:
+    def _press_key():
         d = get_driver()
         active = d.switch_to.active_element
         key = req.key
-        # Map common keys
-        key_map = {
-            "Enter": Keys.ENTER,
-            "Tab": Keys.TAB,
-            "Escape": Keys.ESCAPE,
-            "Backspace": Keys.BACKSPACE
-        }
-        send = key_map.get(key, key)
+        send = _KEY_MAP.get(key, key)
         active.send_keys(send)
+    
+    try:
+        await run_selenium(_press_key)
         return {"success": True}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.get("/browser/alert_present")
 async def browser_alert_present():
-    try:
+    def _alert_present():
         d = get_driver()
         try:
             d.switch_to.alert
-            return {"present": True}
+            return True
         except Exception:
-            return {"present": False}
+            return False
+    
+    try:
+        return {"present": await run_selenium(_alert_present)}
     except Exception as e:
         return {"present": False, "error": str(e)}
 
@@ -497,14 +756,16 @@ async def get_status():
     """Get detailed sandbox status."""
     try:
         # Get system information
-        uptime_result = subprocess.run(["uptime"], capture_output=True, text=True)
-        df_result = subprocess.run(["df", "-h"], capture_output=True, text=True)
-        ps_result = subprocess.run(["ps", "aux"], capture_output=True, text=True)
+        uptime_result, df_result, ps_result = await asyncio.gather(
+            run_cmd(["uptime"]),
+            run_cmd(["df", "-h"]),
+            run_cmd(["ps", "aux"])
+        )
         
         # Check running processes
         processes = []
-        if ps_result.returncode == 0:
-            lines = ps_result.stdout.split('\n')[1:]  # Skip header
+        if ps_result[0] == 0:
+            lines = ps_result[1].split('\n')[1:]  # Skip header
             for line in lines[:10]:  # Top 10 processes
                 if line.strip():
                     parts = line.split()
@@ -519,8 +780,8 @@ async def get_status():
         return {
             "sandbox_type": "linux",
             "status": "running",
-            "uptime": uptime_result.stdout.strip() if uptime_result.returncode == 0 else "unknown",
-            "disk_usage": df_result.stdout if df_result.returncode == 0 else "unknown",
+            "uptime": uptime_result[1].strip() if uptime_result[0] == 0 else "unknown",
+            "disk_usage": df_result[1] if df_result[0] == 0 else "unknown",
             "top_processes": processes,
             "environment": {
                 "display": os.environ.get("DISPLAY", "not set"),
@@ -543,29 +804,33 @@ async def get_status():
             "error": str(e)
         }
 
+# The environment is fixed once the worker starts, so build the VNC responses once
+_VNC_HOST = os.environ.get('RENDER_EXTERNAL_HOSTNAME', 'localhost')
+if 'onrender.com' in _VNC_HOST:
+    # For Render, use the WebSocket proxy path
+    _VNC_REDIRECT_URL = f"/static/vnc.html?autoconnect=true&host={_VNC_HOST}&port=443&encrypt=true&path=websockify"
+else:
+    # Local development
+    _VNC_REDIRECT_URL = f"/static/vnc.html?autoconnect=true&host={_VNC_HOST}&port=6080"
+
+_VNC_INFO = {
+    "vnc_host": "0.0.0.0",
+    "vnc_port": 5900,
+    "novnc_port": 6080,
+    "novnc_url": f"https://{_VNC_HOST}/vnc.html",
+    "password_required": False,
+    "display": ":0"
+}
+
 @app.get("/vnc.html")
 async def vnc_redirect():
     """Redirect to noVNC viewer."""
-    host = os.environ.get('RENDER_EXTERNAL_HOSTNAME', 'localhost')
-    # For Render, use the WebSocket proxy path
-    if 'onrender.com' in host:
-        return RedirectResponse(url=f"/static/vnc.html?autoconnect=true&host={host}&port=443&encrypt=true&path=websockify")
-    else:
-        # Local development
-        return RedirectResponse(url=f"/static/vnc.html?autoconnect=true&host={host}&port=6080")
+    return RedirectResponse(url=_VNC_REDIRECT_URL)
 
 @app.get("/vnc-info")
 async def get_vnc_info():
     """Get VNC connection information."""
-    host = os.environ.get('RENDER_EXTERNAL_HOSTNAME', 'localhost')
-    return {
-        "vnc_host": "0.0.0.0",
-        "vnc_port": 5900,
-        "novnc_port": 6080,
-        "novnc_url": f"https://{host}/vnc.html",
-        "password_required": False,
-        "display": ":0"
-    }
+    return _VNC_INFO
 
 # Add compatibility endpoints for the new sandbox API
 @app.post("/playwright")
@@ -579,7 +844,7 @@ async def playwright_scenario(scenario: str, args: dict = {}):
             
             # Use existing browser navigation
             response = await browser_navigate(NavigateRequest(url=url))
-            screenshot_response = await take_screenshot()
+            screenshot_response = await take_screenshot(quality=SCREENSHOT_DEFAULT_QUALITY)
             
             # Convert to expected format
             return {
@@ -625,4 +890,13 @@ async def static_scan(repo_path: str, session_id: Optional[str] = None):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Every worker owns its own Firefox driver and X connection, so browser
+    # sessions don't span workers; raise WEB_CONCURRENCY only for stateless load.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8080,
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        loop="uvloop",
+        http="httptools"
+    )
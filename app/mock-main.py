@@ -5,19 +5,22 @@ Provides API endpoints for development/cloud environments where full sandboxes a
 """
 
 import os
+import re
 import time
 import base64
 from typing import Dict, Any, Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import logging
+import orjson
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Mock Paladin Linux Sandbox API", version="1.0.0")
+app = FastAPI(title="Mock Paladin Linux Sandbox API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Enable CORS for all origins
 app.add_middleware(
@@ -28,6 +31,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every mock endpoint is pure in-process work; flag anything that takes longer
+SLOW_REQUEST_NS = 5_000_000
+
+@app.middleware("http")
+async def warn_on_slow_requests(request: Request, call_next):
+    start = time.perf_counter_ns()
+    response = await call_next(request)
+    elapsed = time.perf_counter_ns() - start
+    if elapsed > SLOW_REQUEST_NS:
+        logger.warning("Slow mock request: %s %s took %.1f ms",
+                       request.method, request.url.path, elapsed / 1e6)
+    return response
+
 class CommandRequest(BaseModel):
     command: str
     timeout: Optional[int] = 30
@@ -54,14 +70,25 @@ class ScreenshotResponse(BaseModel):
     timestamp: float
     error: Optional[str] = None
 
+# Canned responses for common commands, checked in order
+_MOCK_RESPONSES = [
+    (re.compile(r"\bwhoami\b", re.I), CommandResult(success=True, stdout="sandbox", stderr="", exit_code=0)),
+    (re.compile(r"\bpwd\b", re.I), CommandResult(success=True, stdout="/home/sandbox", stderr="", exit_code=0)),
+    (re.compile(r"\bls\b", re.I), CommandResult(success=True, stdout="Desktop\nDownloads\nDocuments", stderr="", exit_code=0)),
+    (re.compile(r"\b(firefox|browser)\b", re.I), CommandResult(success=True, stdout="Mock browser started in background", stderr="", exit_code=0)),
+]
+
+# Fixed payloads are serialized once at import and returned as raw bytes
+_ROOT_BYTES = orjson.dumps({
+    "message": "Mock Paladin Linux Sandbox API", 
+    "status": "running",
+    "mode": "mock",
+    "warning": "This is a mock sandbox for development/cloud environments"
+})
+
 @app.get("/")
 async def root():
-    return {
-        "message": "Mock Paladin Linux Sandbox API", 
-        "status": "running",
-        "mode": "mock",
-        "warning": "This is a mock sandbox for development/cloud environments"
-    }
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -78,105 +105,98 @@ async def health_check():
 @app.post("/command", response_model=CommandResult)
 async def execute_command(request: CommandRequest):
     """Mock command execution - simulates basic commands."""
-    logger.info(f"Mock command execution: {request.command}")
+    # Handlers here must never block: every response is computed in-process
+    logger.info("Mock command execution: %s", request.command)
     
     # Simulate common commands with mock responses
-    if "whoami" in request.command.lower():
-        return CommandResult(
-            success=True,
-            stdout="sandbox",
-            stderr="",
-            exit_code=0
-        )
-    elif "pwd" in request.command.lower():
-        return CommandResult(
-            success=True,
-            stdout="/home/sandbox",
-            stderr="",
-            exit_code=0
-        )
-    elif "ls" in request.command.lower():
-        return CommandResult(
-            success=True,
-            stdout="Desktop\nDownloads\nDocuments",
-            stderr="",
-            exit_code=0
-        )
-    elif "firefox" in request.command.lower() or "browser" in request.command.lower():
-        return CommandResult(
-            success=True,
-            stdout="Mock browser started in background",
-            stderr="",
-            exit_code=0
-        )
-    else:
-        # Generic success response for other commands
-        return CommandResult(
-            success=True,
-            stdout=f"Mock execution of: {request.command}",
-            stderr="",
-            exit_code=0
-        )
+    for pattern, result in _MOCK_RESPONSES:
+        if pattern.search(request.command):
+            return result
+    
+    # Generic success response for other commands
+    return CommandResult(
+        success=True,
+        stdout=f"Mock execution of: {request.command}",
+        stderr="",
+        exit_code=0
+    )
+
+# Create a small 1x1 PNG pixel as base64 (placeholder)
+# This is a minimal valid PNG image
+placeholder_png_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChAI9jINnFQAAAABJRU5ErkJggg=="
+_SCREENSHOT_PREFIX = b'{"success":true,"image_data":"' + placeholder_png_b64.encode() + b'","format":"png","timestamp":'
+_SCREENSHOT_SUFFIX = b',"error":null}'
 
 @app.get("/screenshot", response_model=ScreenshotResponse)
 async def take_screenshot():
     """Mock screenshot - returns a small placeholder image."""
     logger.info("Mock screenshot requested")
     
-    # Create a small 1x1 PNG pixel as base64 (placeholder)
-    # This is a minimal valid PNG image
-    placeholder_png_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChAI9jINnFQAAAABJRU5ErkJggg=="
-    
-    return ScreenshotResponse(
-        success=True,
-        image_data=placeholder_png_b64,
-        format="png",
-        timestamp=time.time()
+    # Only the timestamp changes between calls
+    return Response(
+        _SCREENSHOT_PREFIX + orjson.dumps(time.time()) + _SCREENSHOT_SUFFIX,
+        media_type="application/json"
     )
 
+_STATUS_BYTES = orjson.dumps({
+    "sandbox_type": "linux-mock",
+    "status": "running",
+    "mode": "mock",
+    "uptime": "Mock uptime: up for development",
+    "disk_usage": "Mock disk usage: 10% used",
+    "top_processes": [
+        {"pid": "1", "cpu": "0.1", "mem": "1.0", "command": "mock-process"},
+        {"pid": "2", "cpu": "0.0", "mem": "0.5", "command": "mock-desktop"}
+    ],
+    "environment": {
+        "display": ":99",
+        "home": "/home/sandbox",
+        "user": "sandbox"
+    },
+    "capabilities": [
+        "mock_command_execution",
+        "mock_screenshot_capture", 
+        "mock_desktop_gui",
+        "development_testing"
+    ],
+    "warning": "This is a mock sandbox for development/cloud environments"
+})
+
 @app.get("/status")
 async def get_status():
     """Mock detailed sandbox status."""
     logger.info("Mock status requested")
     
-    return {
-        "sandbox_type": "linux-mock",
-        "status": "running",
-        "mode": "mock",
-        "uptime": "Mock uptime: up for development",
-        "disk_usage": "Mock disk usage: 10% used",
-        "top_processes": [
-            {"pid": "1", "cpu": "0.1", "mem": "1.0", "command": "mock-process"},
-            {"pid": "2", "cpu": "0.0", "mem": "0.5", "command": "mock-desktop"}
-        ],
-        "environment": {
-            "display": ":99",
-            "home": "/home/sandbox",
-            "user": "sandbox"
-        },
-        "capabilities": [
-            "mock_command_execution",
-            "mock_screenshot_capture", 
-            "mock_desktop_gui",
-            "development_testing"
-        ],
-        "warning": "This is a mock sandbox for development/cloud environments"
-    }
+    return Response(_STATUS_BYTES, media_type="application/json")
+
+_VNC_BYTES = orjson.dumps({
+    "vnc_host": "mock-host",
+    "vnc_port": 5900,
+    "novnc_port": 6080,
+    "novnc_url": "/mock-vnc-not-available",
+    "password_required": False,
+    "display": ":99",
+    "warning": "VNC not available in mock mode"
+})
 
 @app.get("/vnc-info")
 async def get_vnc_info():
     """Mock VNC connection information."""
-    return {
-        "vnc_host": "mock-host",
-        "vnc_port": 5900,
-        "novnc_port": 6080,
-        "novnc_url": "/mock-vnc-not-available",
-        "password_required": False,
-        "display": ":99",
-        "warning": "VNC not available in mock mode"
-    }
+    return Response(_VNC_BYTES, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Mock Paladin Linux Sandbox API")
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Workers need an import string; derive it from this file (main.py in the image)
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    uvicorn.run(
+        f"{module}:app",
+        host="0.0.0.0",
+        port=8080,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # an access line per request is pure overhead for a mock under load
+        access_log=False,
+        log_level="warning"
+    )
@@ -1,43 +1,103 @@
 # playwright_scenarios/auth.py
-import argparse, asyncio, sys
-from playwright.async_api import async_playwright
+import argparse, hashlib, json, os
+from playwright.async_api import TimeoutError as PWTimeoutError
+from . import runtime
+from .shots import fast_shot
 
-async def main():
-    p = argparse.ArgumentParser()
+# naive field detection; improve for your app
+LOGIN_JS = """({u, p}) => {
+  const q = (s) => document.querySelector(s);
+  const user = q('input[name="username"], input[name="user"], input[type="text"]');
+  const pass = q('input[name="password"], input[type="password"]');
+  const btn  = q('button[type="submit"], input[type="submit"]');
+  if (!user || !pass) throw new Error('login fields not found');
+  // the native setter, not el.value: React/Vue controlled inputs shadow the
+  // instance property and would post their own (empty) state otherwise
+  const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+  for (const [el, v] of [[user, u], [pass, p]]) {
+    setValue.call(el, v);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+  }
+  // click() keeps the page's own submit handlers; fall back to a raw submit
+  if (btn) btn.click(); else if (pass.form) pass.form.submit();
+}"""
+
+def add_arguments(p: argparse.ArgumentParser) -> None:
     p.add_argument("--url", required=True)       # base URL
     p.add_argument("--login-path", default="/login")
     p.add_argument("--user", default="admin")
     p.add_argument("--password", default="admin")
-    args = p.parse_args()
 
-    login_url = args.url.rstrip("/") + args.login_path
-    print(f"[auth] login_url={login_url} user={args.user}")
+def _login_url(args) -> str:
+    return args.url.rstrip("/") + args.login_path
+
+def _state_path(args) -> str:
+    # the password is part of the key: a session saved by one login must never
+    # stand in for a run with different credentials (that reads as a bypass)
+    creds = f"{_login_url(args)}\0{args.user}\0{args.password}"
+    digest = hashlib.sha256(creds.encode()).hexdigest()[:16]
+    return f"/tmp/paladin-auth-{digest}.json"
+
+def _save_state(state_path: str, state: dict) -> None:
+    # session cookies: owner-only, and never visible half-written
+    tmp = f"{state_path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_path)
+
+def context_options(args) -> dict:
+    # restore cookies/localStorage from the last successful login, if any
+    state_path = _state_path(args)
+    return {"storage_state": state_path} if os.path.exists(state_path) else {}
+
+async def run(context, args, log=print) -> int:
+    login_url = _login_url(args)
+    state_path = _state_path(args)
+    log(f"[auth] login_url={login_url} user={args.user}")
+
+    page = await context.new_page()
+    logged_in = False
+    if os.path.exists(state_path):
+        # saved session still valid -> skip the login form entirely. Probe the
+        # login page itself: a public base URL never redirects to it, but a
+        # live session is bounced away from it (and shows no password field)
+        await page.goto(login_url, wait_until="domcontentloaded")
+        logged_in = (args.login_path not in page.url
+                     and await page.locator('input[type="password"]').count() == 0)
+        log(f"[auth] saved_session={'valid' if logged_in else 'expired'}")
+        if not logged_in:
+            try:
+                os.unlink(state_path)
+            except FileNotFoundError:
+                pass
+            await context.clear_cookies()
 
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=False)
-        context = await browser.new_context()
-        page = await context.new_page()
+    if not logged_in:
         await page.goto(login_url, wait_until="domcontentloaded")
 
-        # naive field detection; improve for your app
-        await page.fill('input[name="username"], input[name="user"], input[type="text"]', args.user)
-        await page.fill('input[name="password"], input[type="password"]', args.password)
-        await page.click('button[type="submit"], input[type="submit"]')
+        # fill both fields and submit in a single round-trip
+        await page.evaluate(LOGIN_JS, {"u": args.user, "p": args.password})
 
-        await page.wait_for_timeout(1500)
-        title = await page.title()
-        url   = page.url
-        print(f"[auth] after_login url={url} title={title}")
-        await page.screenshot(path="/tmp/auth.png")
-        print("[auth] screenshot=/tmp/auth.png")
+        # resolve as soon as we leave the login page instead of sleeping a fixed 1.5s
+        try:
+            await page.wait_for_url(lambda u: "/login" not in u, timeout=1500)
+        except PWTimeoutError:
+            pass
+        if "/login" not in page.url:
+            _save_state(state_path, await context.storage_state())
 
-        # naive success heuristic: redirected away from /login
-        if "/login" not in url:
-            print("[auth] default credentials accepted")
-            await browser.close()
-            sys.exit(43)  # signal auth bypass
+    title, url = await page.evaluate("() => [document.title, location.href]")
+    log(f"[auth] after_login url={url} title={title}")
+    shot = await fast_shot(page, "/tmp/auth.jpg")
+    log(f"[auth] screenshot=/tmp/auth.jpg ({shot})")
 
-        await browser.close()
+    # naive success heuristic: redirected away from /login
+    if "/login" not in url:
+        log("[auth] default credentials accepted")
+        return 43  # signal auth bypass
+    return 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    runtime.main("auth")
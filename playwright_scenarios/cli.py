@@ -0,0 +1,72 @@
+# playwright_scenarios/cli.py
+"""
+Single entry point for all scenarios.
+
+    python -m playwright_scenarios.cli goto --url https://example.com
+    python -m playwright_scenarios.cli batch jobs.txt   # or "-" for stdin
+
+`batch` reads one scenario command per line (e.g. `xss --url ...`) and runs
+them all in one process against one browser, paying the interpreter,
+Playwright import and Chromium launch once instead of per scenario.
+"""
+import argparse, asyncio, contextlib, shlex, sys
+from playwright.async_api import async_playwright
+from . import runtime
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="playwright_scenarios.cli")
+    sub = p.add_subparsers(dest="scenario", required=True)
+    for name in runtime.SCENARIOS:
+        runtime.load_scenario(name).add_arguments(sub.add_parser(name))
+    batch = sub.add_parser("batch", help="run one scenario command per line")
+    batch.add_argument("jobs", type=argparse.FileType("r"), help="job file, or - for stdin")
+    return p
+
+def parse_job(parser: argparse.ArgumentParser, line: str) -> argparse.Namespace | None:
+    """Parse one job line, or None if it's malformed (argparse has said why on stderr)."""
+    try:
+        args = parser.parse_args(shlex.split(line))
+    except ValueError as e:   # shlex: unbalanced quotes
+        print(f"[cli] {e}", file=sys.stderr)
+        return None
+    except SystemExit:        # argparse error (or --help) must not end the batch
+        return None
+    if args.scenario == "batch":
+        print("[cli] batch jobs cannot nest", file=sys.stderr)
+        return None
+    return args
+
+async def run_batch(lines: list[str]) -> int:
+    parser = build_parser()
+    jobs = [line for line in lines if line.strip() and not line.lstrip().startswith("#")]
+    first_failure = 0
+    async with contextlib.AsyncExitStack() as stack:
+        pw = await stack.enter_async_context(async_playwright())
+        browser = await runtime.launch(pw)
+        stack.push_async_callback(browser.close)
+        for i, line in enumerate(jobs):
+            args = parse_job(parser, line)
+            if args is None:
+                print(f"[cli] job={i} error: bad job line: {line.strip()}")
+                first_failure = first_failure or 2
+                continue
+            try:
+                code = await runtime.run_in_context(browser, runtime.load_scenario(args.scenario), args)
+            except Exception as e:
+                print(f"[cli] job={i} error: {e}")
+                code = 1
+            print(f"[cli] job={i} scenario={args.scenario} exit={code}")
+            first_failure = first_failure or code
+    return first_failure
+
+def main() -> None:
+    argv = sys.argv[1:]
+    args = build_parser().parse_args(argv)
+    if args.scenario == "batch":
+        with args.jobs:
+            lines = args.jobs.readlines()
+        sys.exit(asyncio.run(run_batch(lines)))
+    sys.exit(runtime.run_argv(args.scenario, argv[1:]))
+
+if __name__ == "__main__":
+    main()
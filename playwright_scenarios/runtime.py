@@ -0,0 +1,143 @@
+# playwright_scenarios/runtime.py
+"""
+Shared Playwright runtime for the scenario scripts.
+
+Launching Chromium dominates the cost of a scenario, so a long-lived server
+(`python -m playwright_scenarios.runtime`) keeps one browser alive and runs
+each scenario in a fresh BrowserContext. The scenario CLIs are thin clients:
+they forward their argv over a Unix socket and relay the output lines and
+exit code. When no server is listening they launch a browser locally.
+"""
+import argparse, asyncio, contextlib, importlib, json, os, sys
+from playwright.async_api import async_playwright
+
+SOCKET_PATH = os.getenv("PALADIN_PW_SOCKET", "/tmp/paladin-pw.sock")
+# Longest JSON line either side of the socket may send (StreamReader default is 64 KiB)
+LINE_LIMIT = 1 << 20
+SCENARIOS = ("goto", "xss", "auth")
+LAUNCH_ARGS = [
+    "--disable-gpu", "--disable-dev-shm-usage", "--no-sandbox", "--disable-extensions",
+    "--disable-background-networking", "--disable-sync", "--mute-audio",
+]
+# Headless skips compositing and X round-trips; PALADIN_HEADFUL=1 shows the browser on the VNC desktop
+HEADLESS = os.getenv("PALADIN_HEADFUL") != "1"
+
+_state: dict = {}
+_launch_lock = asyncio.Lock()
+
+def load_scenario(name: str):
+    if name not in SCENARIOS:
+        raise ValueError(f"unknown scenario: {name}")
+    return importlib.import_module(f"playwright_scenarios.{name}")
+
+def parse_args(module, argv: list[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog=module.__name__)
+    module.add_arguments(p)
+    return p.parse_args(argv)
+
+async def launch(pw):
+    args = LAUNCH_ARGS + ["--headless=new"] if HEADLESS else LAUNCH_ARGS
+    return await pw.chromium.launch(headless=HEADLESS, args=args)
+
+async def get_browser():
+    """Return the shared browser, starting Playwright/Chromium on first use."""
+    async with _launch_lock:
+        browser = _state.get("browser")
+        if browser is None or not browser.is_connected():
+            if "pw" not in _state:
+                # start() rather than `async with`, which would tear down on exit
+                _state["pw"] = await async_playwright().start()
+            browser = _state["browser"] = await launch(_state["pw"])
+        return browser
+
+async def run_in_context(browser, module, args, log=print) -> int:
+    # scenarios may customise their context (e.g. auth restoring storage_state)
+    options = module.context_options(args) if hasattr(module, "context_options") else {}
+    context = await browser.new_context(**options)
+    try:
+        return await module.run(context, args, log)
+    finally:
+        await context.close()
+
+# ---- server ----------------------------------------------------------------
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    def send(msg: dict) -> None:
+        writer.write(json.dumps(msg).encode() + b"\n")
+
+    try:
+        req = json.loads(await reader.readline())
+        module = load_scenario(req["scenario"])
+        args = parse_args(module, req.get("argv", []))
+        code = await run_in_context(await get_browser(), module, args,
+                                    log=lambda line: send({"line": line}))
+    except SystemExit as e:      # argparse rejected the argv
+        code = e.code if isinstance(e.code, int) else 2
+    except Exception as e:
+        send({"line": f"[runtime] error: {e}"})
+        code = 1
+    send({"exit": code})
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(path: str = SOCKET_PATH) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+    await get_browser()
+    server = await asyncio.start_unix_server(_handle, path=path, limit=LINE_LIMIT)
+    print(f"[runtime] listening on {path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await shutdown()
+
+async def shutdown() -> None:
+    """Close the shared browser and stop Playwright so no Chromium is orphaned."""
+    browser, pw = _state.pop("browser", None), _state.pop("pw", None)
+    if browser is not None:
+        await browser.close()
+    if pw is not None:
+        await pw.stop()
+
+# ---- client ----------------------------------------------------------------
+
+async def _run_remote(name: str, argv: list[str]) -> int:
+    reader, writer = await asyncio.open_unix_connection(SOCKET_PATH, limit=LINE_LIMIT)
+    writer.write(json.dumps({"scenario": name, "argv": argv}).encode() + b"\n")
+    await writer.drain()
+    code = 1
+    async for raw in reader:
+        msg = json.loads(raw)
+        if "line" in msg:
+            print(msg["line"], flush=True)
+        elif "exit" in msg:
+            code = msg["exit"]
+    writer.close()
+    return code
+
+async def _run_local(name: str, argv: list[str]) -> int:
+    module = load_scenario(name)
+    args = parse_args(module, argv)
+    # every resource is released on any exit path, including scenario errors
+    async with contextlib.AsyncExitStack() as stack:
+        pw = await stack.enter_async_context(async_playwright())
+        browser = await launch(pw)
+        stack.push_async_callback(browser.close)
+        return await run_in_context(browser, module, args)
+
+def run_argv(name: str, argv: list[str]) -> int:
+    """Run one scenario: prefer the warm server, else run locally."""
+    try:
+        return asyncio.run(_run_remote(name, argv))
+    except (FileNotFoundError, ConnectionRefusedError):
+        return asyncio.run(_run_local(name, argv))
+
+def main(name: str) -> None:
+    """Entry point for the scenario scripts."""
+    sys.exit(run_argv(name, sys.argv[1:]))
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,45 @@
+# playwright_scenarios/shots.py
+"""Fast scenario screenshots via a raw CDP Page.captureScreenshot."""
+import asyncio, base64, hashlib, os, weakref
+
+# One CDP session per page so the session setup round-trips happen once
+_cdp_sessions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+# SHA-256 of the last image written to each output path
+_last_hash: dict[str, bytes] = {}
+
+async def _cdp(page):
+    cdp = _cdp_sessions.get(page)
+    if cdp is None:
+        cdp = _cdp_sessions[page] = await page.context.new_cdp_session(page)
+    return cdp
+
+def _blocking_write(path: str, data: bytes) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+async def fast_shot(page, out_path: str, quality: int = 85) -> str:
+    """Capture the viewport as JPEG and write it to out_path.
+
+    Returns "unchanged" (and skips the write) when the capture is identical
+    to the one already at out_path, otherwise "written".
+    """
+    cdp = await _cdp(page)
+    res = await cdp.send("Page.captureScreenshot", {
+        "format": "jpeg",
+        "quality": quality,
+        "optimizeForSpeed": True,
+        "captureBeyondViewport": False,
+    })
+    data = base64.b64decode(res["data"])
+    h = hashlib.sha256(data).digest()
+    if _last_hash.get(out_path) == h and os.path.exists(out_path):
+        return "unchanged"
+    # write off the event loop so concurrent scenarios in the runtime aren't stalled
+    await asyncio.get_running_loop().run_in_executor(None, _blocking_write, out_path, data)
+    _last_hash[out_path] = h
+    return "written"
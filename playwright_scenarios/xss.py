@@ -1,6 +1,8 @@
 # playwright_scenarios/xss.py
-import argparse, asyncio, sys, json
-from playwright.async_api import async_playwright
+import argparse, asyncio
+from playwright.async_api import TimeoutError as PWTimeoutError
+from . import runtime
+from .shots import fast_shot
 
 XSS_EVENTS_JS = """
 window.__xssFired = false;
@@ -10,44 +12,52 @@ window.__xssFired = false;
 });
 """
 
-async def main():
-    p = argparse.ArgumentParser()
+def add_arguments(p: argparse.ArgumentParser) -> None:
     p.add_argument("--url", required=True)
     p.add_argument("--payload", default="<script>alert('xss')</script>")
-    args = p.parse_args()
-
-    print(f"[xss] url={args.url} payload={args.payload}")
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=False)
-        context = await browser.new_context()
-        page = await context.new_page()
-        await page.add_init_script(XSS_EVENTS_JS)
-        await page.goto(args.url, wait_until="domcontentloaded")
-
-        inputs = page.locator("input, textarea, [contenteditable=true]")
-        count = await inputs.count()
-        print(f"[xss] inputs_found={count}")
-
-        fired = False
-        for i in range(count):
-            el = inputs.nth(i)
-            try:
-                await el.fill(args.payload)
-            except Exception:
-                continue
-        # try submitting any form on the page
-        forms = page.locator("form")
-        if await forms.count() > 0:
-            await forms.nth(0).evaluate("(f)=>f.submit()")
-            await page.wait_for_timeout(1000)
 
+async def run(context, args, log=print) -> int:
+    log(f"[xss] url={args.url} payload={args.payload}")
+    # installed once on the context so every page/navigation in it is hooked.
+    # Must run in the page's main world: an isolated-world CDP script
+    # (Page.addScriptToEvaluateOnNewDocument with worldName) can't wrap the
+    # page's own alert/confirm/prompt.
+    await context.add_init_script(XSS_EVENTS_JS)
+    page = await context.new_page()
+    await page.goto(args.url, wait_until="domcontentloaded")
+
+    # resolve every input once (and count forms alongside)
+    forms = page.locator("form")
+    handles, n_forms = await asyncio.gather(
+        page.locator("input, textarea, [contenteditable=true]").element_handles(),
+        forms.count(),
+    )
+    log(f"[xss] inputs_found={len(handles)}")
+
+    # one at a time: fill() focuses and types through the page keyboard,
+    # so concurrent fills would race on focus and cross payloads
+    for h in handles:
+        try:
+            await h.fill(args.payload)
+        except Exception:
+            pass   # hidden/readonly/non-text inputs
+    # try submitting any form on the page
+    if n_forms > 0:
+        await forms.nth(0).evaluate("(f)=>f.submit()")
+        # resolve as soon as the payload fires instead of sleeping a fixed 1s
+        try:
+            await page.wait_for_function("window.__xssFired === true", timeout=1000)
+            fired = True
+        except PWTimeoutError:
+            fired = False
+    else:
         fired = await page.evaluate("window.__xssFired")
-        await page.screenshot(path="/tmp/xss.png")
-        print(f"[xss] xss_alert={fired} screenshot=/tmp/xss.png")
-        await browser.close()
+    shot = await fast_shot(page, "/tmp/xss.jpg")
+    log(f"[xss] xss_alert={fired} screenshot=/tmp/xss.jpg ({shot})")
 
-        if fired:
-            sys.exit(42)   # signal detection
+    if fired:
+        return 42   # signal detection
+    return 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    runtime.main("xss")
@@ -1,23 +1,43 @@
 # sandbox_api/executor.py
-import asyncio, shlex, subprocess
-from typing import AsyncIterator
+import asyncio, functools, shlex, shutil
+from typing import AsyncIterator, Sequence
 
 class ExecError(Exception): ...
 
-async def stream_process(cmd: str, timeout: int | None = None) -> AsyncIterator[str]:
-    """Yield stdout/stderr lines as SSE data."""
+@functools.lru_cache(maxsize=256)
+def _split(cmd: str) -> tuple[str, ...]:
+    """Tokenize cmd once; agent loops re-run the same commands constantly."""
+    return tuple(shlex.split(cmd))
+
+@functools.lru_cache(maxsize=None)
+def resolve_executable(name: str) -> str:
+    """Resolve a command name to its absolute path once per process."""
+    return shutil.which(name) or name
+
+def _argv(cmd: str | Sequence[str]) -> tuple[str, ...]:
+    """Strings are shell-style command lines; sequences are already argv and pass through untouched.
+
+    argv[0] is made absolute: together with close_fds=False that lets CPython
+    spawn via posix_spawn instead of forking this (large) worker.
+    """
+    argv = _split(cmd) if isinstance(cmd, str) else tuple(cmd)
+    return (resolve_executable(argv[0]),) + argv[1:] if argv else argv
+
+async def _stream_bytes(cmd: str | Sequence[str], timeout: int | None = None) -> AsyncIterator[bytes]:
+    """Yield raw stdout/stderr lines, trailing newline included."""
     proc = await asyncio.create_subprocess_exec(
-        *shlex.split(cmd),
+        *_argv(cmd),
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.STDOUT,
-        text=True
+        limit=1 << 20,  # tolerate long lines (default StreamReader limit is 64 KiB)
+        close_fds=False
     )
     try:
         while True:
-            line = await asyncio.wait_for(proc.stdout.readline(), timeout=timeout)
-            if not line:
+            raw = await asyncio.wait_for(proc.stdout.readline(), timeout=timeout)
+            if not raw:
                 break
-            yield line.rstrip("\n")
+            yield raw
     finally:
         try:
             await asyncio.wait_for(proc.wait(), timeout=3)
@@ -25,8 +45,101 @@ async def stream_process(cmd: str, timeout: int | None = None) -> AsyncIterator[
             proc.kill()
             await proc.wait()
 
-async def run_capture(cmd: str, timeout: int | None = None) -> tuple[int, str]:
-    buf = []
-    async for line in stream_process(cmd, timeout):
-        buf.append(line)
-    return 0, "\n".join(buf)
+async def stream_process(cmd: str | Sequence[str], timeout: int | None = None) -> AsyncIterator[str]:
+    """Yield stdout/stderr lines as SSE data."""
+    async for raw in _stream_bytes(cmd, timeout):
+        yield raw.rstrip(b"\n").decode("utf-8", "replace")
+
+async def stream_process_tagged(cmd: str | Sequence[str], timeout: int | None = None) -> AsyncIterator[tuple[str, str]]:
+    """Yield (stream, line) pairs with stdout and stderr kept apart, as each line arrives."""
+    proc = await asyncio.create_subprocess_exec(
+        *_argv(cmd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=1 << 20,
+        close_fds=False
+    )
+    queue: asyncio.Queue[tuple[str, str] | None] = asyncio.Queue()
+
+    async def pump(stream: asyncio.StreamReader, name: str) -> None:
+        try:
+            async for raw in stream:
+                await queue.put((name, raw.rstrip(b"\n").decode("utf-8", "replace")))
+        finally:
+            await queue.put(None)
+
+    readers = [asyncio.create_task(pump(proc.stdout, "stdout")),
+               asyncio.create_task(pump(proc.stderr, "stderr"))]
+    try:
+        open_streams = len(readers)
+        while open_streams:
+            item = await asyncio.wait_for(queue.get(), timeout=timeout)
+            if item is None:
+                open_streams -= 1
+                continue
+            yield item
+    finally:
+        for task in readers:
+            task.cancel()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=3)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+
+async def run_capture(cmd: str | Sequence[str], timeout: int | None = None) -> tuple[int, str]:
+    """Run cmd to completion and return (exit code, combined stdout/stderr)."""
+    proc = await asyncio.create_subprocess_exec(
+        *_argv(cmd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        close_fds=False
+    )
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        out, _ = await proc.communicate()
+    if out.endswith(b"\n"):
+        out = out[:-1]
+    return proc.returncode, out.decode("utf-8", "replace")
+
+async def batch_lines(source: AsyncIterator, window: float) -> AsyncIterator[list]:
+    """Regroup source items into lists of whatever arrives within `window` seconds of the first.
+
+    A quiet stream still yields single-item batches immediately after the
+    window; a chatty one collapses hundreds of lines into one batch.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        finally:
+            await queue.put(done)
+
+    task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            batch = [item]
+            deadline = loop.time() + window
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is done:
+                    yield batch
+                    await task   # re-raise a source failure (e.g. a read timeout)
+                    return
+                batch.append(item)
+            yield batch
+        await task
+    finally:
+        task.cancel()
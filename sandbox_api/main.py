@@ -1,16 +1,60 @@
 # sandbox_api/main.py
 from fastapi import FastAPI, HTTPException, Body, Query
-from fastapi.responses import StreamingResponse, JSONResponse
-from sse_starlette.sse import EventSourceResponse
-import asyncio, json, os
+from fastapi.responses import ORJSONResponse, FileResponse
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+import asyncio, itertools, os, re, sys
+from concurrent.futures import ThreadPoolExecutor
+import httpx, orjson
 
-from .settings import settings
+from .settings import settings, TIMEOUT_DEFAULT
 from .screens import screenshot_png_response
-from .executor import stream_process, run_capture
-from .scanners.static_runner import run_all
+from .executor import stream_process, stream_process_tagged, batch_lines
+from .scenarios import stream_scenario
+from .scanners.static_runner import run_all, run_all_to_files, result_path, tool_path, SCANNERS
 from .scanners.sarif_merge import merge_sarif, post_findings
 
-app = FastAPI(title="Paladin Linux Sandbox API")
+app = FastAPI(title="Paladin Linux Sandbox API", default_response_class=ORJSONResponse)
+
+# Keep-alive comment interval for SSE streams so proxies don't drop long scans
+SSE_PING_SECONDS = 15
+
+@app.on_event("startup")
+async def use_pidfd_child_watcher():
+    # Reap children via pidfd on the loop instead of a waitpid thread per child.
+    # 3.12+ already picks pidfd by default and deprecates child watchers;
+    # uvloop reaps through libuv and has no child watcher to replace.
+    policy = asyncio.get_event_loop_policy()
+    if not isinstance(policy, asyncio.DefaultEventLoopPolicy):
+        return
+    if sys.version_info < (3, 12) and hasattr(os, "pidfd_open") and hasattr(asyncio, "PidfdChildWatcher"):
+        try:
+            os.close(os.pidfd_open(os.getpid()))   # kernel >= 5.3
+        except OSError:
+            return
+        watcher = asyncio.PidfdChildWatcher()
+        # a watcher set after the loop started has to be attached by hand,
+        # otherwise every create_subprocess_exec fails as "not activated"
+        watcher.attach_loop(asyncio.get_running_loop())
+        policy.set_child_watcher(watcher)
+
+@app.on_event("startup")
+async def open_http_client():
+    # one pooled client so control-plane posts reuse keep-alive connections
+    app.state.http = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_keepalive_connections=8))
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await app.state.http.aclose()
+
+@app.on_event("startup")
+async def start_screenshot_pool():
+    # in-process captures block on the X server; a pool of its own keeps them
+    # off the event loop without queueing behind Starlette's shared threads
+    app.state.screenshot_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="screenshot")
+
+@app.on_event("shutdown")
+async def stop_screenshot_pool():
+    app.state.screenshot_pool.shutdown(wait=False)
 
 @app.get("/health")
 async def health(): return {"ok": True}
@@ -18,39 +62,91 @@ async def health(): return {"ok": True}
 @app.get("/status")
 async def status():
     return {"ok": True, "capabilities": {
-        "vnc": True, "playwright": True, "screenshot": True, "execute": bool(settings.ALLOW_EXEC)
+        "vnc": True, "playwright": True, "screenshot": True, "execute": bool(settings.ALLOW_EXEC),
+        "scanners": {name: tool_path(name) is not None for name in SCANNERS}
     }}
 
 @app.get("/screenshot")
-async def screenshot(): return screenshot_png_response()
+async def screenshot():
+    return await screenshot_png_response(app.state.screenshot_pool)
+
+def _coalesced(lines, coalesce_ms: int, event: str):
+    """Per-line events, or with coalesce_ms > 0 one event per window whose data is a JSON array of lines."""
+    async def gen():
+        if coalesce_ms <= 0:
+            async for line in lines:
+                yield ServerSentEvent(data=line, event=event)
+            return
+        async for batch in batch_lines(lines, coalesce_ms / 1000):
+            yield ServerSentEvent(data=orjson.dumps(batch).decode(), event=event)
+    return gen()
 
 @app.post("/execute")
-async def execute(cmd: str = Body(..., embed=True), timeout: int = Query(settings.TIMEOUT_DEFAULT)):
+async def execute(cmd: str = Body(..., embed=True), timeout: int = Query(TIMEOUT_DEFAULT),
+                  split: bool = Query(False), coalesce_ms: int = Query(0, ge=0, le=1000)):
+    """
+    split=true emits separate "stdout"/"stderr" events instead of merged "data".
+    coalesce_ms>0 batches lines arriving within that window into one event
+    carrying a JSON array, for chatty commands.
+    """
     if not settings.ALLOW_EXEC: raise HTTPException(403, "exec disabled")
     async def eventgen():
-        async for line in stream_process(cmd, timeout):
-            yield {"event":"data","data": line}
-        yield {"event":"end","data":"done"}
-    return EventSourceResponse(eventgen())
+        if not split:
+            async for ev in _coalesced(stream_process(cmd, timeout), coalesce_ms, "data"):
+                yield ev
+        elif coalesce_ms <= 0:
+            async for stream, line in stream_process_tagged(cmd, timeout):
+                yield ServerSentEvent(data=line, event=stream)
+        else:
+            async for batch in batch_lines(stream_process_tagged(cmd, timeout), coalesce_ms / 1000):
+                # keep stdout/stderr apart: one event per consecutive run of a stream
+                for stream, group in itertools.groupby(batch, key=lambda item: item[0]):
+                    yield ServerSentEvent(data=orjson.dumps([line for _, line in group]).decode(), event=stream)
+        yield ServerSentEvent(data="done", event="end")
+    return EventSourceResponse(eventgen(), ping=SSE_PING_SECONDS)
 
 @app.post("/playwright")
-async def playwright(scenario: str = Body(...), args: dict = Body(default={})):
+async def playwright(scenario: str = Body(...), args: dict = Body(default={}),
+                     coalesce_ms: int = Query(0, ge=0, le=1000)):
     """
     scenario: 'goto' | 'xss' | 'auth'
     args: dict of CLI args
+    coalesce_ms: as for /execute
     """
-    cmd = ["python","-m", f"playwright_scenarios.{scenario}"] + \
-          sum(([f"--{k}", str(v)] for k,v in args.items()), [])
+    argv = sum(([f"--{k}", str(v)] for k,v in args.items()), [])
     async def eventgen():
-        async for line in stream_process(" ".join(cmd), timeout=300):
-            yield {"event":"data","data": line}
-        yield {"event":"end","data":"done"}
-    return EventSourceResponse(eventgen())
+        async for ev in _coalesced(stream_scenario(scenario, argv, timeout=300), coalesce_ms, "data"):
+            yield ev
+        yield ServerSentEvent(data="done", event="end")
+    return EventSourceResponse(eventgen(), ping=SSE_PING_SECONDS)
 
 @app.post("/scan/static")
-async def scan_static(repo_path: str = Body(...), session_id: str | None = Body(None)):
-    sarifs = run_all(repo_path)
+async def scan_static(repo_path: str = Body(...), session_id: str | None = Body(None),
+                      since: str | None = Query(None), manifest: bool = Query(False)):
+    """
+    since: git revision (e.g. HEAD~1); only files changed since then are scanned.
+    manifest=true writes each scanner's runs to an NDJSON file and returns only
+    {scan_id, scanners: [{name, path, result_count}]}; fetch the runs from
+    GET /scan/static/{scan_id}/{name}.
+    """
+    if since and since.startswith("-"):
+        raise HTTPException(400, "since must be a git revision")
+    if manifest:
+        if session_id:
+            raise HTTPException(400, "manifest mode does not post findings; omit session_id")
+        scan_id, scanners = await run_all_to_files(repo_path, since)
+        return {"scan_id": scan_id, "scanners": scanners}
+    sarifs = await run_all(repo_path, since)
     merged = merge_sarif(sarifs)
     if settings.CONTROL_PLANE_URL and session_id:
-        post_findings(settings.CONTROL_PLANE_URL, settings.CONTROL_PLANE_TOKEN or "", session_id, merged)
-    return JSONResponse(merged)
\ No newline at end of file
+        await post_findings(app.state.http, settings.CONTROL_PLANE_URL, settings.CONTROL_PLANE_TOKEN or "", session_id, merged)
+    return ORJSONResponse(merged)
+
+@app.get("/scan/static/{scan_id}/{name}")
+async def scan_static_result(scan_id: str, name: str):
+    if not re.fullmatch(r"[0-9a-f]{32}", scan_id) or name not in SCANNERS:
+        raise HTTPException(404, "no such result")
+    path = result_path(scan_id, name)
+    if not os.path.isfile(path):
+        raise HTTPException(404, "no such result")
+    return FileResponse(path, media_type="application/x-ndjson")
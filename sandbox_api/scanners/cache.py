@@ -0,0 +1,140 @@
+# sandbox_api/scanners/cache.py
+"""
+On-disk SARIF cache keyed by (scanner, scanner build, key); callers fold the
+scanned root into the key alongside the tree content.
+
+The tree key is found in two steps. A cheap stat fingerprint
+(relpath, size, mtime_ns) is looked up first, and the file contents are
+hashed only when it misses, so a fresh checkout of an unchanged commit still
+hits. Entries are zstd-compressed JSON, expire after CACHE_TTL and are
+evicted least-recently-used beyond CACHE_MAX_ENTRIES per scanner.
+"""
+import hashlib, os, tempfile, time
+from typing import Any, Dict, Iterator
+import orjson, zstandard
+from ..settings import settings
+
+CACHE_TTL = 24 * 3600
+CACHE_MAX_ENTRIES = 2000
+SKIP_DIRS = {".git"}
+_READ_CHUNK = 1 << 20
+
+def _root() -> str:
+    return os.path.expanduser(settings.SCAN_CACHE_DIR)
+
+def _walk(path: str, rel: str = "") -> Iterator[tuple[str, os.DirEntry]]:
+    # sorted, so the same tree always hashes the same
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for e in entries:
+        r = f"{rel}/{e.name}" if rel else e.name
+        if e.is_dir(follow_symlinks=False):
+            if e.name not in SKIP_DIRS:
+                yield from _walk(e.path, r)
+        elif e.is_file(follow_symlinks=False):
+            yield r, e
+
+def fingerprint(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    for rel, e in _walk(path):
+        st = e.stat(follow_symlinks=False)
+        h.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+def content_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    for rel, e in _walk(path):
+        h.update(rel.encode() + b"\0")
+        with open(e.path, "rb") as f:
+            while chunk := f.read(_READ_CHUNK):
+                h.update(chunk)
+        h.update(b"\n")
+    return h.hexdigest()
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _fresh(st: os.stat_result) -> bool:
+    return time.time() - st.st_mtime < CACHE_TTL
+
+def scan_cache_key(path: str) -> str:
+    """Content key for the tree at path, via the stat fingerprint when it's known."""
+    index = os.path.join(_root(), "fingerprints", fingerprint(path))
+    try:
+        if _fresh(os.stat(index)):
+            with open(index) as f:
+                return f.read()
+    except OSError:
+        pass
+    key = content_hash(path)
+    try:
+        _write_atomic(index, key.encode())
+    except OSError:
+        pass
+    return key
+
+def subset_key(tree_key: str, files: list[str]) -> str:
+    """Key for a scan of just these files within the tree."""
+    h = hashlib.blake2b(tree_key.encode(), digest_size=20)
+    for f in sorted(files):
+        h.update(b"\0" + f.encode(errors="surrogateescape"))
+    return f"subset-{h.hexdigest()}"
+
+def file_key(path: str) -> str:
+    """Content key for a single input file (e.g. requirements.txt)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            h.update(chunk)
+    return f"file-{h.hexdigest()}"
+
+def tool_version(exe: str) -> str:
+    """Identify a scanner build by its binary; an upgrade replaces the file."""
+    st = os.stat(exe)
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+def _entry(scanner: str, version: str, key: str) -> str:
+    name = hashlib.blake2b(f"{version}:{key}".encode(), digest_size=20).hexdigest()
+    return os.path.join(_root(), scanner, f"{name}.sarif.zst")
+
+def load(scanner: str, version: str, key: str) -> Dict[str, Any] | None:
+    path = _entry(scanner, version, key)
+    try:
+        st = os.stat(path)
+        if not _fresh(st):
+            return None
+        with open(path, "rb") as f:
+            sarif = orjson.loads(zstandard.decompress(f.read()))
+        # atime is the LRU clock; mtime stays the creation time for the TTL
+        os.utime(path, (time.time(), st.st_mtime))
+        return sarif
+    except (OSError, zstandard.ZstdError, orjson.JSONDecodeError):
+        return None
+
+def store(scanner: str, version: str, key: str, sarif: Dict[str, Any]) -> None:
+    path = _entry(scanner, version, key)
+    try:
+        _write_atomic(path, zstandard.compress(orjson.dumps(sarif)))
+        _evict(os.path.dirname(path))
+    except OSError:
+        pass   # a cache that can't be written just means the next scan runs again
+
+def _evict(directory: str) -> None:
+    with os.scandir(directory) as it:
+        entries = [e for e in it if e.name.endswith(".sarif.zst")]
+    if len(entries) <= CACHE_MAX_ENTRIES:
+        return
+    entries.sort(key=lambda e: e.stat().st_atime)
+    for e in entries[:len(entries) - CACHE_MAX_ENTRIES]:
+        try:
+            os.unlink(e.path)
+        except FileNotFoundError:
+            pass
@@ -1,24 +1,22 @@
 # sandbox_api/scanners/sarif_merge.py
+from itertools import chain
 from typing import List, Dict, Any
-import httpx, os
+import httpx, orjson
 
 def merge_sarif(sarifs: List[Dict[str, Any]]) -> Dict[str, Any]:
-    if not sarifs:
-        return {"version":"2.1.0","runs":[]}
-    base = {"version":"2.1.0","runs":[]}
-    for s in sarifs:
-        base["runs"].extend(s.get("runs",[]))
-    return base
+    # flatten in one pass; () avoids a throwaway [] for scanners without runs
+    return {"version":"2.1.0","runs": list(chain.from_iterable(s.get("runs") or () for s in sarifs))}
 
-def post_findings(control_plane_url: str, token: str, session_id: str, sarif: Dict[str, Any]) -> None:
+async def post_findings(client: httpx.AsyncClient, control_plane_url: str, token: str, session_id: str, sarif: Dict[str, Any]) -> None:
     try:
         url = f"{control_plane_url.rstrip('/')}/api/findings"
-        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
         payload = {"session_id": session_id, "source": "sast", "sarif": sarif}
         
-        with httpx.Client(timeout=30) as client:
-            response = client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
+        response = await client.post(url, content=orjson.dumps(payload), headers=headers)
+        response.raise_for_status()
     except Exception as e:
         # Log error but don't fail the scan
         print(f"Failed to post findings to control plane: {e}")
@@ -1,74 +1,355 @@
 # sandbox_api/scanners/static_runner.py
-import json, os, subprocess, tempfile, time
+import asyncio, functools, os, shutil, signal, tempfile, time, uuid
+from collections import OrderedDict
 from typing import Dict, Any, List
+import ijson, orjson
+from . import cache
+from ..settings import settings
 
-def _run(cmd: list[str], cwd: str | None = None, timeout: int = 180) -> tuple[int, str, str]:
+SCANNERS = ("semgrep", "bandit", "pip-audit", "trivy", "gitleaks")
+# Seconds a timed-out scanner gets between SIGTERM and SIGKILL
+KILL_GRACE = 2
+# Worker count for scanners that parallelise internally (semgrep --jobs, trivy --parallel)
+SCANNER_JOBS = str(os.cpu_count() or 4)
+
+@functools.lru_cache(maxsize=None)
+def tool_path(name: str) -> str | None:
+    """Resolve a scanner on PATH once per process (shutil.which, no fork)."""
+    return shutil.which(name)
+
+async def _spawn(exe: str, args: list[str], cwd: str | None, stdout: int, stderr: int) -> asyncio.subprocess.Process:
+    # Own session/process group, so a timeout can take down the analyzer
+    # workers semgrep/trivy fork as well, not just the parent. (This rules out
+    # posix_spawn before 3.13; a clean kill matters more for multi-minute scans.)
+    return await asyncio.create_subprocess_exec(exe, *args, cwd=cwd, stdout=stdout, stderr=stderr,
+                                                close_fds=False, start_new_session=True)
+
+async def _terminate(p: asyncio.subprocess.Process) -> None:
+    """SIGTERM the scanner's process group, escalating to SIGKILL after KILL_GRACE."""
     try:
-        p = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        try:
-            out, err = p.communicate(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            p.kill(); out, err = p.communicate()
-        return p.returncode, out, err
-    except FileNotFoundError:
-        # Tool not found, return empty result
-        return 1, "", f"Tool {cmd[0]} not found"
+        os.killpg(p.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    try:
+        await asyncio.wait_for(p.wait(), KILL_GRACE)
+        return
+    except asyncio.TimeoutError:
+        pass
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await p.wait()
+
+async def _run_sarif(cmd: list[str], cwd: str | None = None, timeout: int = 180,
+                     ok_codes: tuple[int, ...] = (0,)) -> Dict[str, Any] | None:
+    """Run a scanner that prints SARIF and parse its runs incrementally off stdout.
+
+    Runs are decoded as the scanner emits them, so the raw document is never
+    buffered whole and parsing overlaps with the scan itself. The parse reads
+    the pipe on a worker thread: several multi-MB SARIF streams then decode
+    side by side without holding up the event loop.
 
-def semgrep_sarif(path: str) -> Dict[str, Any] | None:
+    Returns None unless the scanner exited with one of ok_codes and printed a
+    document with a top-level runs array: a crashed scan must not read (and
+    be cached) as a clean one.
+    """
+    exe = tool_path(cmd[0])
+    if exe is None:
+        return None
+    read_fd, write_fd = os.pipe()
     try:
-        code, out, err = _run(["semgrep", "--sarif","--quiet","--error","--timeout","120","-r","auto", path])
-        return json.loads(out) if out.strip().startswith("{") else None
+        # stderr is never used; sending it to /dev/null means there is no second
+        # pipe that can fill up and stall the scanner while we're parsing stdout
+        p = await _spawn(exe, cmd[1:], cwd, write_fd, asyncio.subprocess.DEVNULL)
+    except BaseException:
+        os.close(read_fd)
+        raise
+    finally:
+        os.close(write_fd)   # the scanner holds its own copy
+
+    def parse() -> List[Dict[str, Any]] | None:
+        # closing our end on the way out (e.g. not SARIF) SIGPIPEs the writer
+        runs, has_runs, builder = [], False, None
+        with open(read_fd, "rb") as f:
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == "runs.item" and event == "end_map":
+                        runs.append(builder.value)
+                        builder = None
+                elif prefix == "runs" and event == "start_array":
+                    has_runs = True
+                elif prefix == "runs.item" and event == "start_map":
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+        return runs if has_runs else None
+
+    async def collect() -> List[Dict[str, Any]] | None:
+        runs = await asyncio.to_thread(parse)
+        await p.wait()
+        return runs if p.returncode in ok_codes else None
+
+    try:
+        runs = await asyncio.wait_for(collect(), timeout)
+    except (asyncio.TimeoutError, ijson.JSONError):
+        # timed out, or not SARIF (e.g. an error message on stdout): stop the
+        # scanner's group, which also ends a parse still blocked on the pipe
+        await _terminate(p)
+        return None
+    if runs is None:
+        return None
+    return {"version": "2.1.0", "runs": runs}
+
+async def semgrep_sarif(path: str, targets: List[str] | None = None) -> Dict[str, Any] | None:
+    try:
+        return await _run_sarif(["semgrep", "--sarif","--quiet","--error","--timeout","120","--jobs", SCANNER_JOBS,"-r","auto",
+                                 *(targets or [path])], ok_codes=(0, 1))
     except Exception:
         return None
 
-def bandit_sarif(path: str) -> Dict[str, Any] | None:
+async def bandit_sarif(path: str, targets: List[str] | None = None) -> Dict[str, Any] | None:
     try:
-        code, out, err = _run(["bandit", "-r", path, "-f", "sarif", "-q"])
-        return json.loads(out) if out.strip().startswith("{") else None
+        return await _run_sarif(["bandit", "-r", *(targets or [path]), "-f", "sarif", "-q"], ok_codes=(0, 1))
     except Exception:
         return None
 
-def pip_audit_sarif(path: str) -> Dict[str, Any] | None:
+async def pip_audit_sarif(path: str, targets: List[str] | None = None) -> Dict[str, Any] | None:
+    # targets don't narrow an audit of the declared dependencies
     try:
         # Check if requirements.txt exists
         req_file = os.path.join(path, "requirements.txt")
         if not os.path.exists(req_file):
             return None
-        code, out, err = _run(["pip-audit","-f","sarif","-r","requirements.txt"], cwd=path)
-        return json.loads(out) if out.strip().startswith("{") else None
+        return await _run_sarif(["pip-audit","-f","sarif","-r", os.path.join(path, "requirements.txt")],
+                                ok_codes=(0, 1))
     except Exception:
         return None
 
-def trivy_fs_sarif(path: str) -> Dict[str, Any] | None:
+async def trivy_fs_sarif(path: str, targets: List[str] | None = None) -> Dict[str, Any] | None:
+    # trivy fs takes a single root, so targets don't narrow it
     try:
-        code, out, err = _run(["trivy","fs","--format","sarif","--quiet","."] , cwd=path)
-        return json.loads(out) if out.strip().startswith("{") else None
+        return await _run_sarif(["trivy","fs","--parallel", SCANNER_JOBS,"--format","sarif","--quiet", path])
     except Exception:
         return None
 
-def gitleaks_sarif(path: str) -> Dict[str, Any] | None:
+async def gitleaks_sarif(path: str, targets: List[str] | None = None) -> Dict[str, Any] | None:
+    # likewise gitleaks -s: a diff scan still checks the whole tree
     try:
-        code, out, err = _run(["gitleaks","detect","-s", path, "--no-git","--report-format","sarif"])
-        # Check if sarif file was created
-        sarif_file = os.path.join(path, "gitleaks.sarif")
-        if os.path.exists(sarif_file):
-            with open(sarif_file, 'r') as f:
-                return json.load(f)
-        return None
+        # report straight to our pipe instead of a sidecar file in the repo
+        return await _run_sarif(["gitleaks","detect","-s", path, "--no-git","--report-format","sarif",
+                                 "--report-path","/dev/stdout"], ok_codes=(0, 1))
     except Exception:
         return None
 
-def run_all(path: str) -> List[Dict[str, Any]]:
+_scan_sem: asyncio.Semaphore | None = None
+
+def scan_semaphore() -> asyncio.Semaphore:
+    """Scanner subprocesses allowed at once, across all concurrent /scan/static calls.
+
+    Built on first use so it belongs to the running loop; sized by
+    MAX_CONCURRENT_SCANNERS (0 = one per CPU).
+    """
+    global _scan_sem
+    if _scan_sem is None:
+        _scan_sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANNERS or os.cpu_count() or 4)
+    return _scan_sem
+
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+def _requirements_key(path: str) -> str | None:
+    try:
+        return cache.file_key(os.path.join(path, "requirements.txt"))
+    except OSError:
+        return None
+
+# Scanners whose result depends on one input file rather than the whole tree:
+# editing app code mustn't cost another (network-bound) pip-audit run
+_NARROW_KEYS = {"pip-audit": _requirements_key}
+
+# Parsed SARIF per (scanner, build, key), ahead of the disk cache; entries
+# age out on the disk cache's CACHE_TTL so new advisories and rules get picked up
+PARSED_CACHE_MAX = 256
+_parsed: "OrderedDict[tuple, tuple[float, Dict[str, Any]]]" = OrderedDict()
+_scanner_inflight: Dict[tuple, asyncio.Task] = {}
+
+async def _load_or_scan(tool: str, fn, path: str, targets: List[str] | None,
+                        version: str, key: str) -> Dict[str, Any] | None:
+    hit = await asyncio.to_thread(cache.load, tool, version, key)
+    if hit is not None:
+        return hit
+    async with scan_semaphore():
+        sarif = await fn(path, targets)
+    if sarif is not None:
+        await asyncio.to_thread(cache.store, tool, version, key, sarif)
+    return sarif
+
+async def _limited(tool: str, fn, path: str, targets: List[str] | None, key: str | None,
+                   memo: bool = True) -> Dict[str, Any] | None:
+    exe = tool_path(tool)
+    if key is not None and tool in _NARROW_KEYS:
+        key = await asyncio.to_thread(_NARROW_KEYS[tool], path)
+    if key is None or exe is None:
+        async with scan_semaphore():
+            return await fn(path, targets)
+    # scanners write absolute artifact URIs, so an identical tree elsewhere
+    # must not be answered with this one's file locations
+    key = f"{os.path.realpath(path)}\0{key}"
+
+    ck = (tool, cache.tool_version(exe), key)
+    hit = _parsed.get(ck)
+    if hit is not None:
+        if time.monotonic() - hit[0] < cache.CACHE_TTL:
+            _parsed.move_to_end(ck)
+            return hit[1]
+        del _parsed[ck]
+    # requests racing on the same tree share one disk lookup / scanner run
+    task = _scanner_inflight.get(ck)
+    if task is None:
+        task = _scanner_inflight[ck] = asyncio.create_task(_load_or_scan(tool, fn, path, targets, ck[1], key))
+        task.add_done_callback(lambda _: _scanner_inflight.pop(ck, None))
+    sarif = await asyncio.shield(task)
+    if memo and sarif is not None:
+        _parsed[ck] = (time.monotonic(), sarif)
+        if len(_parsed) > PARSED_CACHE_MAX:
+            _parsed.popitem(last=False)
+    return sarif
+
+async def _tree_key(path: str) -> str | None:
+    if not settings.ALLOW_SCAN_CACHE:
+        return None
+    try:
+        return await asyncio.to_thread(cache.scan_cache_key, path)
+    except OSError:
+        return None
+
+async def _scan(path: str, targets: List[str] | None = None, sink=None) -> List[Any]:
+    """Run the installed scanners concurrently.
+
+    sink(tool, sarif), when given, is awaited as each scanner finishes and its
+    return value is kept instead of the SARIF, so big documents can be handed
+    off and dropped one by one rather than held until the slowest scanner ends.
+    """
+    # Only use tools that are actually installed (tool_path is resolved once per process)
+    available_scanners = [(tool, fn) for tool, fn in
+                          (("semgrep", semgrep_sarif), ("bandit", bandit_sarif), ("pip-audit", pip_audit_sarif),
+                           ("trivy", trivy_fs_sarif), ("gitleaks", gitleaks_sarif))
+                          if tool_path(tool) is not None]
+    if not available_scanners:
+        return []
+
+    # hashed once and shared: every scanner sees the same tree
+    key = await _tree_key(path)
+    if key is not None and targets is not None:
+        key = cache.subset_key(key, targets)   # a partial scan mustn't answer for the full one
+    async def one(tool: str, fn) -> Any:
+        # manifest scans (sink) write results out and mustn't keep them resident
+        sarif = await _limited(tool, fn, path, targets, key, memo=sink is None)
+        if sink is not None and sarif:
+            return await sink(tool, sarif)
+        return sarif
+
+    # Scanners are independent subprocesses, so run them concurrently
+    results = await asyncio.gather(*(one(tool, fn) for tool, fn in available_scanners), return_exceptions=True)
     res = []
-    # Only use tools that are likely to be available
-    available_scanners = [semgrep_sarif, bandit_sarif, pip_audit_sarif]
-    
-    for fn in available_scanners:
-        try:
-            sarif = fn(path)
-            if sarif:
-                res.append(sarif)
-        except Exception as e:
-            print(f"Scanner {fn.__name__} failed: {e}")
-            pass
+    for (_, fn), sarif in zip(available_scanners, results):
+        if isinstance(sarif, Exception):
+            print(f"Scanner {fn.__name__} failed: {sarif}")
+        elif sarif:
+            res.append(sarif)
     return res
+
+# Past this many changed files a diff scan stops paying off (and argv grows long)
+CHANGED_FILES_MAX = 500
+
+async def changed_files(path: str, since: str) -> List[str] | None:
+    """Existing files under path changed since the given git revision, or None if git can't say."""
+    git = tool_path("git")
+    if git is None:
+        return None
+    p = await asyncio.create_subprocess_exec(
+        git, "-C", path, "diff", "--name-only", "-z", "--diff-filter=ACMR", "--relative", since, "--",
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL, close_fds=False)
+    try:
+        out, _ = await asyncio.wait_for(p.communicate(), 30)
+    except asyncio.TimeoutError:
+        p.kill(); await p.wait()
+        return None
+    if p.returncode != 0:
+        return None
+    return [os.path.join(path, f) for f in out.decode(errors="surrogateescape").split("\0") if f]
+
+async def _diff_targets(path: str, since: str) -> List[str] | None:
+    """Files to scan for a diff scan: [] if nothing changed, None to scan everything."""
+    files = await changed_files(path, since)
+    if files is None or len(files) > CHANGED_FILES_MAX:
+        return None
+    return files
+
+async def run_all(path: str, since: str | None = None) -> List[Dict[str, Any]]:
+    """Scan path; unchanged trees are answered from the per-scanner content caches.
+
+    With since (a git revision), only files changed since then are given to
+    the file-level scanners; when git can't answer or too much changed this
+    falls back to the full scan.
+
+    Identical scans already running are joined rather than started again.
+    """
+    targets = await _diff_targets(path, since) if since else None
+    if targets == []:
+        return []
+    key = (os.path.realpath(path), tuple(targets) if targets else None)
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(_scan(path, targets))
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one client disconnecting mustn't cancel a scan others are waiting on
+    return await asyncio.shield(task)
+
+# Per-scan result files for run_all_to_files, removed after RESULTS_TTL
+RESULTS_DIR = os.path.join(tempfile.gettempdir(), "paladin-scans")
+RESULTS_TTL = 3600
+
+def result_path(scan_id: str, tool: str) -> str:
+    return os.path.join(RESULTS_DIR, scan_id, f"{tool}.runs.ndjson")
+
+def _write_runs(out_path: str, sarif: Dict[str, Any]) -> int:
+    """Write one SARIF run per line; returns the number of results."""
+    count = 0
+    with open(out_path, "wb") as f:
+        for run in sarif.get("runs") or ():
+            count += len(run.get("results") or ())
+            f.write(orjson.dumps(run))
+            f.write(b"\n")
+    return count
+
+def _prune_results() -> None:
+    cutoff = time.time() - RESULTS_TTL
+    try:
+        entries = list(os.scandir(RESULTS_DIR))
+    except FileNotFoundError:
+        return
+    for e in entries:
+        if e.is_dir(follow_symlinks=False) and e.stat().st_mtime < cutoff:
+            shutil.rmtree(e.path, ignore_errors=True)
+
+async def run_all_to_files(path: str, since: str | None = None) -> tuple[str, List[Dict[str, Any]]]:
+    """Like run_all, but each scanner's runs go to an NDJSON file as soon as it finishes.
+
+    Returns (scan_id, manifest) where the manifest lists {name, path,
+    result_count} per scanner; no SARIF is kept in memory (or in the
+    in-process result cache) once written.
+    """
+    scan_id = uuid.uuid4().hex
+    await asyncio.to_thread(_prune_results)
+    targets = await _diff_targets(path, since) if since else None
+    if targets == []:
+        return scan_id, []
+    os.makedirs(os.path.join(RESULTS_DIR, scan_id))
+
+    async def sink(tool: str, sarif: Dict[str, Any]) -> Dict[str, Any]:
+        out_path = result_path(scan_id, tool)
+        count = await asyncio.to_thread(_write_runs, out_path, sarif)
+        return {"name": tool, "path": out_path, "result_count": count}
+
+    return scan_id, await _scan(path, targets, sink)
@@ -0,0 +1,49 @@
+# sandbox_api/scenarios.py
+import asyncio, os, sys
+import orjson
+from typing import AsyncIterator
+from .executor import stream_process
+
+# Same socket the warm runtime (python -m playwright_scenarios.runtime) listens on
+PW_SOCKET = os.getenv("PALADIN_PW_SOCKET", "/tmp/paladin-pw.sock")
+# Scenarios running at once; each one holds a browser context (or a whole Chromium on fallback)
+SCENARIO_SEM = asyncio.Semaphore(os.cpu_count() or 4)
+
+async def _stream_remote(reader: asyncio.StreamReader, timeout: int | None) -> AsyncIterator[str]:
+    while True:
+        raw = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        if not raw:
+            break
+        msg = orjson.loads(raw)
+        if "line" in msg:
+            yield msg["line"]
+
+async def stream_scenario(scenario: str, argv: list[str], timeout: int | None = None) -> AsyncIterator[str]:
+    """Yield a scenario's output lines, talking to the warm runtime directly.
+
+    Skips the per-request `python -m playwright_scenarios.<name>` client
+    (interpreter start + playwright import); that path is only used when
+    the runtime isn't listening.
+    """
+    async with SCENARIO_SEM:
+        async for line in _stream_scenario(scenario, argv, timeout):
+            yield line
+
+async def _stream_scenario(scenario: str, argv: list[str], timeout: int | None) -> AsyncIterator[str]:
+    try:
+        # same 1 MiB line limit as executor._stream_bytes: page text and evaluate
+        # results easily exceed the 64 KiB StreamReader default
+        reader, writer = await asyncio.open_unix_connection(PW_SOCKET, limit=1 << 20)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # argv goes to exec as-is: payloads with spaces/quotes survive intact
+        cmd = [sys.executable, "-m", f"playwright_scenarios.{scenario}", *argv]
+        async for line in stream_process(cmd, timeout):
+            yield line
+        return
+    try:
+        writer.write(orjson.dumps({"scenario": scenario, "argv": argv}) + b"\n")
+        await writer.drain()
+        async for line in _stream_remote(reader, timeout):
+            yield line
+    finally:
+        writer.close()
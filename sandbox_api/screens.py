@@ -1,12 +1,137 @@
 # sandbox_api/screens.py
-import subprocess, io
+import asyncio, os, shlex, functools, threading
+from concurrent.futures import Executor
 from fastapi import HTTPException
-from fastapi.responses import Response
-from .settings import settings
+from fastapi.responses import Response, StreamingResponse
+from .settings import SCREENSHOT_CMD, Settings
+from .executor import resolve_executable
 
-def screenshot_png_response() -> Response:
+try:
+    import mss, mss.tools
+except ImportError:   # image without mss: the command pipeline is the only path
+    mss = None
+
+SCREENSHOT_TIMEOUT = 10
+STREAM_CHUNK = 64 * 1024
+# zlib level for in-process PNGs: screenshots are viewed once, speed beats size
+PNG_LEVEL = 1
+# the stock command is a plain `a | b` pipeline we can exec stage by stage;
+# anything customised may rely on other shell syntax and goes through sh
+_DEFAULT_CMD = SCREENSHOT_CMD == Settings.model_fields["SCREENSHOT_CMD"].default
+# a customised SCREENSHOT_CMD is an explicit choice and always wins over mss
+_USE_MSS = mss is not None and _DEFAULT_CMD
+# mss holds an X connection that mustn't be shared across the pool's threads
+_local = threading.local()
+
+def _grab_png() -> bytes:
+    """Capture the root window in-process over a per-thread X connection."""
+    sct = getattr(_local, "sct", None)
+    if sct is None:
+        sct = _local.sct = mss.mss()
+    try:
+        shot = sct.grab(sct.monitors[0])
+    except mss.ScreenShotError:
+        # e.g. X restarted; drop the dead connection and reconnect next time
+        _local.sct = None
+        sct.close()
+        raise
+    return mss.tools.to_png(shot.rgb, shot.size, level=PNG_LEVEL)
+
+@functools.lru_cache(maxsize=8)
+def _stages(cmd: str) -> tuple[tuple[str, ...], ...]:
+    """Split the default `a | b` pipeline into argv lists so no shell is needed."""
+    stages = (shlex.split(part) for part in cmd.split("|"))
+    # absolute executables so Popen can take the posix_spawn path
+    return tuple((resolve_executable(argv[0]), *argv[1:]) for argv in stages)
+
+async def _spawn_pipeline(cmd: str) -> list[asyncio.subprocess.Process]:
+    """Start the stages chained fd-to-fd; only the last stage's stdout comes back to us."""
+    if not _DEFAULT_CMD:
+        return [await asyncio.create_subprocess_shell(
+            cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)]
+    stages = _stages(cmd)
+    procs: list[asyncio.subprocess.Process] = []
+    stdin = None
+    try:
+        for i, argv in enumerate(stages):
+            read_fd, write_fd = os.pipe() if i < len(stages) - 1 else (None, None)
+            try:
+                procs.append(await asyncio.create_subprocess_exec(
+                    *argv, stdin=stdin,
+                    stdout=write_fd if write_fd is not None else asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL, close_fds=False))
+            finally:
+                # the children hold their own copies of the pipe ends
+                if stdin is not None:
+                    os.close(stdin)
+                if write_fd is not None:
+                    os.close(write_fd)
+            stdin = read_fd
+    except BaseException:
+        if stdin is not None:
+            os.close(stdin)
+        await _reap(procs)
+        raise
+    return procs
+
+async def _reap(procs: list[asyncio.subprocess.Process], grace: float = 0) -> None:
+    for p in procs:
+        if p.returncode is None:
+            # kill() on an already-exited child would reap it behind the
+            # child watcher's back, so give finished stages a moment first
+            try:
+                await asyncio.wait_for(p.wait(), grace)
+                continue
+            except asyncio.TimeoutError:
+                p.kill()
+        await p.wait()
+
+class _PipelineResponse(StreamingResponse):
+    """Reaps the pipeline once the response is over, whether or not the body was ever iterated."""
+    def __init__(self, procs: list[asyncio.subprocess.Process], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.procs = procs
+        self.finished = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # a client that disconnects mid-image gets the stages killed outright;
+            # shielded so a cancelled request still waits its children
+            await asyncio.shield(_reap(self.procs, grace=1 if self.finished else 0))
+
+async def _stream_pipeline(cmd: str) -> Response:
+    procs = await _spawn_pipeline(cmd)
+    out = procs[-1].stdout
+    try:
+        first = await asyncio.wait_for(out.read(STREAM_CHUNK), SCREENSHOT_TIMEOUT)
+    except BaseException:
+        await _reap(procs)
+        raise
+    if not first:
+        # nothing was produced, so the status line can still report the failure
+        await _reap(procs, grace=1)
+        codes = [p.returncode for p in procs]
+        raise HTTPException(status_code=500, detail=f"screenshot failed: exit codes {codes}")
+
+    async def body():
+        # send bytes while the encoder is still writing the rest
+        yield first
+        while chunk := await asyncio.wait_for(out.read(STREAM_CHUNK), SCREENSHOT_TIMEOUT):
+            yield chunk
+        resp.finished = True
+    resp = _PipelineResponse(procs, body(), media_type="image/png")
+    return resp
+
+async def screenshot_png_response(pool: Executor) -> Response:
+    if _USE_MSS:
+        loop = asyncio.get_running_loop()
+        try:
+            return Response(content=await loop.run_in_executor(pool, _grab_png), media_type="image/png")
+        except mss.ScreenShotError:
+            pass   # fall through to the pipeline for this request
     try:
-        p = subprocess.run(settings.SCREENSHOT_CMD, shell=True, check=True, stdout=subprocess.PIPE)
-        return Response(content=p.stdout, media_type="image/png")
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"screenshot failed: {e}")
+        return await _stream_pipeline(SCREENSHOT_CMD)
+    except (asyncio.TimeoutError, OSError) as e:
+        raise HTTPException(status_code=500, detail=f"screenshot failed: {e!r}")
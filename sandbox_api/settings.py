@@ -7,7 +7,16 @@ class Settings(BaseSettings):
     ALLOW_EXEC: int = 1                       # 0/1 to enable /execute
     SCREENSHOT_CMD: str = "xwd -root -silent | convert xwd:- png:-"
     TIMEOUT_DEFAULT: int = 120
+    ALLOW_SCAN_CACHE: int = 1                 # 0/1 to reuse on-disk SARIF for unchanged trees
+    SCAN_CACHE_DIR: str = "~/.cache/paladin"
+    MAX_CONCURRENT_SCANNERS: int = 0          # scanner processes at once; 0 = os.cpu_count()
 
-    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    # frozen: values are bound once at import (SCREENSHOT_CMD, TIMEOUT_DEFAULT below),
+    # so nothing may change them afterwards and drift from those copies
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
 
 settings = Settings()
+
+# Fixed for the process lifetime; bound once for the per-request paths
+SCREENSHOT_CMD = settings.SCREENSHOT_CMD
+TIMEOUT_DEFAULT = settings.TIMEOUT_DEFAULT
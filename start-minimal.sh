@@ -16,4 +16,5 @@ sleep 1
 # Start FastAPI server immediately (highest priority)
 echo "Starting FastAPI server..."
 cd /app
-exec python3 -m uvicorn main:app --host 0.0.0.0 --port 8080 --log-level info
+exec python3 -m uvicorn main:app --host 0.0.0.0 --port 8080 --log-level info \
+    --loop uvloop --http httptools --workers ${WEB_CONCURRENCY:-1}
@@ -10,7 +10,8 @@ PORT=${PORT:-8080}
 # Start FastAPI API FIRST on the primary port so Render binds correctly
 echo "Starting FastAPI server on port ${PORT}..."
 cd /app
-python3 -m uvicorn main:app --host 0.0.0.0 --port ${PORT} --log-level info &
+python3 -m uvicorn main:app --host 0.0.0.0 --port ${PORT} --log-level info \
+    --loop uvloop --http httptools --workers ${WEB_CONCURRENCY:-1} &
 
 # Start Xvfb (virtual framebuffer)
 echo "Starting Xvfb..."
@@ -96,7 +97,8 @@ while true; do
     if ! pgrep -f "uvicorn main:app" > /dev/null; then
         echo "FastAPI server stopped! Restarting..."
         cd /app
-        python3 -m uvicorn main:app --host 0.0.0.0 --port ${PORT} --log-level info &
+        python3 -m uvicorn main:app --host 0.0.0.0 --port ${PORT} --log-level info \
+            --loop uvloop --http httptools --workers ${WEB_CONCURRENCY:-1} &
     fi
     
     # Check other critical services